@@ -76,6 +76,8 @@ KUBEVIRT_VM_PLURAL = "virtualmachines"
 KUBEVIRT_VMI_PLURAL = "virtualmachineinstances"
 
 MANAGED_BY = "cyberdesk-operator"
+# Copied from the VMI template onto the virt-launcher pod so the gateway can find it in one list
+DESK_ID_LABEL = "cyberdesk.io/desk-id"
 CYBERDESK_NAMESPACE = os.getenv("CYBERDESK_NAMESPACE", "cyberdesk-system")
 
 # ---------------------------------------------------------------------------
@@ -405,7 +407,28 @@ def crd_bootstrap(spec: dict, meta: dict, **_: Dict[str, object]) -> None:
             raise kopf.PermanentError(f"CRD creation failed: {exc.status} {exc.reason}") from exc
 
 
-def _ensure_vm_patched_and_running(vm_name: str, namespace: str, logger: kopf.Logger) -> None:
+def _label_running_desk(vmi: dict, namespace: str, logger: kopf.Logger, instance_id: str) -> None:
+    """
+    Stamp DESK_ID_LABEL on an already-running VMI and its virt-launcher pod.
+
+    Template labels only reach pods created after the patch, so a warm-pool VM
+    that was running before assignment would otherwise never carry the label.
+    """
+    vmi_name = vmi["metadata"]["name"]
+    label_patch = {"metadata": {"labels": {DESK_ID_LABEL: instance_id}}}
+    CUSTOM_OBJECTS_API.patch_namespaced_custom_object(
+        KUBEVIRT_GROUP, KUBEVIRT_VERSION, namespace, KUBEVIRT_VMI_PLURAL, vmi_name, body=label_patch
+    )
+    # virt-controller labels each launcher pod with the UID of the VMI it runs
+    pods = CORE_V1_API.list_namespaced_pod(
+        namespace, label_selector=f"kubevirt.io/created-by={vmi['metadata']['uid']}"
+    )
+    for pod in pods.items:
+        CORE_V1_API.patch_namespaced_pod(pod.metadata.name, namespace, body=label_patch)
+        logger.info(f"Labelled virt-launcher pod '{pod.metadata.name}' with {DESK_ID_LABEL}={instance_id}.")
+
+
+def _ensure_vm_patched_and_running(vm_name: str, namespace: str, logger: kopf.Logger, instance_id: str) -> None:
     """Fetch the VM and apply the required patches (metadata, spec, runStrategy)."""
     logger.info(f"Ensuring VM '{vm_name}' is patched and set to run.")
     # Labels intended for the VMI must go into spec.template.metadata.labels
@@ -428,6 +451,7 @@ def _ensure_vm_patched_and_running(vm_name: str, namespace: str, logger: kopf.Lo
                         "cyberdesk-instance": vm_name,
                         "managed-by": MANAGED_BY, # Also label the VMI for consistency
                         "kubevirt.io/domain": vm_name, # This is often set here
+                        DESK_ID_LABEL: instance_id,
                     }
                     # Add annotations for the VMI if needed
                 },
@@ -476,7 +500,7 @@ def cyberdesk_create(spec: dict, meta: dict, status: dict, logger: kopf.Logger,
         try:
             # Make sure the VM (assigned or cloned) is correctly patched
             # _ensure_vm_patched_and_running should be idempotent
-            _ensure_vm_patched_and_running(vm_ref, namespace, logger)
+            _ensure_vm_patched_and_running(vm_ref, namespace, logger, instance_id)
 
             # Ensure status reflects reality (especially startTime/expiryTime if they were missed)
             if "startTime" not in current_status or "expiryTime" not in current_status:
@@ -528,7 +552,7 @@ def cyberdesk_create(spec: dict, meta: dict, status: dict, logger: kopf.Logger,
                 # --- Patch Assigned VM ---
                 vm_patch_body = {
                     "metadata": {"labels": {"app": "cyberdesk", "cyberdesk-instance": instance_id, "managed-by": MANAGED_BY}},
-                    "spec": {"template": {"metadata": {"labels": {"app": "cyberdesk", "cyberdesk-instance": instance_id, "managed-by": MANAGED_BY, "kubevirt.io/domain": instance_id}}}}
+                    "spec": {"template": {"metadata": {"labels": {"app": "cyberdesk", "cyberdesk-instance": instance_id, "managed-by": MANAGED_BY, "kubevirt.io/domain": instance_id, DESK_ID_LABEL: instance_id}}}}
                 }
                 # Fetch current VM to merge labels correctly
                 current_vm = CUSTOM_OBJECTS_API.get_namespaced_custom_object(KUBEVIRT_GROUP, KUBEVIRT_VERSION, namespace, KUBEVIRT_VM_PLURAL, assigned_vm_name)
@@ -558,6 +582,8 @@ def cyberdesk_create(spec: dict, meta: dict, status: dict, logger: kopf.Logger,
                          logger.warning(f"Pool-assigned VMI '{assigned_vm_name}' is not Running or has no IP yet (Phase: {vmi_phase}, IP: {vmi_ip}). Retrying.")
                          raise kopf.TemporaryError(f"Pool-assigned VMI {assigned_vm_name} not fully ready.")
                     logger.info(f"Verified pool-assigned VMI '{assigned_vm_name}' is Running with IP {vmi_ip}.")
+                    # The VMI was already running, so the template label never reached its pod
+                    _label_running_desk(vmi, namespace, logger, instance_id)
 
                 except ApiException as vmi_exc:
                     if vmi_exc.status == 404:
@@ -686,7 +712,7 @@ def cyberdesk_create(spec: dict, meta: dict, status: dict, logger: kopf.Logger,
         if clone_phase == "Succeeded":
             logger.info(f"Clone '{clone_op_name}' succeeded. Finalizing VM '{instance_id}'.")
             # --- Ensure the newly created VM is patched and running ---
-            _ensure_vm_patched_and_running(instance_id, namespace, logger) # Target VM name is instance_id
+            _ensure_vm_patched_and_running(instance_id, namespace, logger, instance_id) # Target VM name is instance_id
 
             # --- Update Status (Clone Success) ---
             now = datetime.now(UTC)
@@ -17,30 +17,44 @@ Designed to run either:
 from __future__ import annotations
 
 import asyncio
+import functools
+import gzip
+import hashlib
 import logging
+import mimetypes
 import os
+import re
 import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Callable, Awaitable, Optional, List, Any
+from typing import Callable, Awaitable, AsyncIterator, Optional, List, Any
 import httpx
 import websockets
+from cachetools import TTLCache
 from fastapi import (
+    Depends,
     FastAPI,
+    Header,
     WebSocket,
     WebSocketDisconnect,
     HTTPException,
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from kubernetes import client, config
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
+from starlette.websockets import WebSocketState
+from starlette.types import Scope
+from kubernetes import client, config, watch
 from kubernetes.client import ApiException, CustomObjectsApi, CoreV1Api
 from pydantic import BaseModel, Field
-from supabase import create_client, Client
 from dotenv import load_dotenv
-import json
 import socket
+import orjson
 
 # --------------------------------------------------------------------------- #
 # Logging
@@ -73,6 +87,61 @@ KUBEVIRT_GROUP = "kubevirt.io"
 KUBEVIRT_VERSION = "v1"
 KUBEVIRT_VMI_PLURAL = "virtualmachineinstances"
 
+# The service-account token is mounted for the life of the pod, so whether we're
+# in-cluster can't change after startup.
+SERVICE_ACCOUNT_TOKEN_PATH = Path("/var/run/secrets/kubernetes.io/serviceaccount/token")
+IN_CLUSTER: bool = SERVICE_ACCOUNT_TOKEN_PATH.exists()
+
+VNC_PORT = 5901 # websockify inside the VM
+# Local mode relies on a manual `kubectl port-forward pod/<vmi-pod> 5901:5901`
+LOCAL_VNC_URI = f"ws://host.docker.internal:{VNC_PORT}"
+# Frames queued behind an in-flight send are merged into one message up to this size
+VNC_COALESCE_BYTES = 16 * 1024
+VNC_RELAY_QUEUE = 64 # frames buffered per direction before reads pause
+# Keepalive pings on the upstream VNC socket, so dead VMs drop the browser session
+VNC_PING_INTERVAL: float = float(os.getenv("CYBERDESK_VNC_PING_INTERVAL", "20"))
+
+# Public URL handed to clients for a desk's noVNC page; only the desk id varies
+STREAM_URL_PREFIX = os.getenv("CYBERDESK_STREAM_URL_PREFIX", "https://gateway.cyberdesk.io/vnc/")
+
+# Label the operator stamps on each VMI template (and thus its virt-launcher pod)
+DESK_ID_LABEL = "cyberdesk.io/desk-id"
+# KubeVirt's label (and annotation) naming the VM a virt-launcher pod runs
+VM_DOMAIN_LABEL = "kubevirt.io/domain"
+# Selector prefix; lookups only append the VM name
+VM_DOMAIN_SELECTOR_PREFIX = f"{VM_DOMAIN_LABEL}="
+# Fall back to the Cyberdesk CR -> virtualMachineRef lookup for pods without the
+# desk-id label. The operator labels pool VMs' running pods on assignment, but
+# desks assigned by older operators don't have it: leave this on until they've
+# all expired, or those desks will answer 404.
+CR_LOOKUP_FALLBACK: bool = os.getenv("CYBERDESK_CR_LOOKUP_FALLBACK", "1").lower() in ("1", "true", "yes")
+
+# Set (e.g. from spec.nodeName via the downward API) when a gateway only serves
+# the VMs on its own node; pod lists and the pod watch are then scoped to it.
+NODE_NAME: Optional[str] = os.getenv("K8S_NODE_NAME") or None
+
+# execDaemon endpoints inside each VM
+VM_DAEMON_PORT = 8000
+VM_COMMAND_PATH = "execute-command"
+VM_COMMAND_TIMEOUT = 30.0 # Longer timeout for potential command execution
+VM_HEALTH_PATH = "health"
+VM_HEALTH_TIMEOUT = 10.0
+# Seconds a VM's health answer is reused, so frequent probes don't all reach the VM
+VM_HEALTH_CACHE_TTL: float = float(os.getenv("CYBERDESK_VM_HEALTH_CACHE_TTL", "1"))
+
+# Request bodies are serialized with orjson up front and sent as raw content
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Seconds to establish a TCP connection to a VM pod; read budgets are per call
+VM_CONNECT_TIMEOUT = 2.0
+
+# Negotiate HTTP/2 (via TLS ALPN) on the shared client, e.g. for Supabase. Plain-HTTP
+# VM calls stay on HTTP/1.1 keep-alive, since the execDaemon isn't known to speak h2c.
+HTTP2_ENABLED: bool = os.getenv("CYBERDESK_HTTP2", "1").lower() in ("1", "true", "yes")
+
+# Max concurrent proxied requests per VM, so one caller can't flood its execDaemon
+VM_MAX_IN_FLIGHT: int = int(os.getenv("CYBERDESK_VM_MAX_IN_FLIGHT", "4"))
+
 # --------------------------------------------------------------------------- #
 # Kubernetes client bootstrap
 # --------------------------------------------------------------------------- #
@@ -96,8 +165,160 @@ def init_kube_clients() -> tuple[Optional[CustomObjectsApi], Optional[CoreV1Api]
 
 K8S_CUSTOM_API, K8S_CORE_V1_API = init_kube_clients()
 
+# Blocking K8s SDK calls run here rather than on the shared default executor,
+# which also bounds how many requests we have in flight against the apiserver.
+K8S_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CYBERDESK_K8S_MAX_WORKERS", "6")),
+    thread_name_prefix="k8s",
+)
+
+
+async def _k8s_call(fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking K8s SDK call on K8S_EXECUTOR.
+
+    Unlike asyncio.to_thread this skips the per-call contextvars snapshot; the
+    SDK calls don't rely on any context variables.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(K8S_EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+
+def _call_api_raw(api_client: client.ApiClient, **call_api_args: Any) -> tuple[bytes, int]:
+    """
+    ``call_api`` without the SDK's response deserialization.
+
+    With ``response_type='str'`` the SDK json-decodes the body and then ``str()``s
+    it, handing back a Python repr. Reading the raw urllib3 body avoids that.
+    Blocking; run it through _k8s_call.
+    """
+    response, status_code, _ = api_client.call_api(_preload_content=False, **call_api_args)
+    try:
+        return response.data, status_code
+    finally:
+        response.release_conn()
+
+def _is_pod_gone(e: ApiException) -> bool:
+    """
+    Whether a pods/proxy 404 came from the API server because the pod no
+    longer exists, as opposed to a 404 the VM's daemon returned itself.
+    """
+    if e.status != 404 or not e.body:
+        return False
+    try:
+        body = orjson.loads(e.body)
+    except orjson.JSONDecodeError:
+        return False
+    return (
+        isinstance(body, dict)
+        and body.get("kind") == "Status"
+        and body.get("reason") == "NotFound"
+        and (body.get("details") or {}).get("kind") == "pods"
+    )
+
+# call_api arguments that never vary; header dicts are copied per call since the
+# SDK merges its default headers into the one it's given.
+K8S_AUTH_SETTINGS = ["BearerToken"]
+
+# Ask for pod lists as metadata only; plain JSON if the server can't do that
+POD_METADATA_ACCEPT = "application/json;as=PartialObjectMetadataList;v=v1;g=meta.k8s.io,application/json"
+
+
+def _list_pod_metadata(core_api: CoreV1Api, namespace: str, **query: Any) -> list[dict]:
+    """
+    List pods in *namespace* and return each pod's ``metadata`` dict.
+
+    The list is requested as a PartialObjectMetadataList, so the apiserver
+    leaves out spec and status, and the body is parsed with orjson instead of
+    the SDK's model deserializer. *query* holds API query parameters by their
+    wire names (``labelSelector``, ``limit``, ...); None values are dropped.
+    Blocking; run it through _k8s_call.
+    """
+    body, _ = _call_api_raw(
+        core_api.api_client,
+        resource_path=f"/api/v1/namespaces/{namespace}/pods",
+        method="GET",
+        query_params=[(key, value) for key, value in query.items() if value is not None],
+        header_params={"Accept": POD_METADATA_ACCEPT},
+        auth_settings=K8S_AUTH_SETTINGS,
+        _request_timeout=10,
+    )
+    return [item["metadata"] for item in orjson.loads(body).get("items") or ()]
+
+
+class AsyncCustomObjectsApi:
+    """
+    The CustomObjectsApi calls the gateway makes, issued natively on the event
+    loop over httpx instead of through K8S_EXECUTOR. Host, TLS and credentials
+    come from the SDK configuration loaded above; failures raise ApiException
+    so callers handle them exactly as before.
+    """
+
+    def __init__(self, configuration: client.Configuration) -> None:
+        self._configuration = configuration
+        verify = ssl.create_default_context(cafile=configuration.ssl_ca_cert)
+        if not configuration.verify_ssl:
+            # insecure-skip-tls-verify: don't check the server, but still present our cert
+            verify.check_hostname = False
+            verify.verify_mode = ssl.CERT_NONE
+        if configuration.cert_file:
+            verify.load_cert_chain(configuration.cert_file, configuration.key_file)
+        # Same SNI / hostname override the SDK's urllib3 pool applies
+        self._extensions = {"sni_hostname": configuration.tls_server_name} if configuration.tls_server_name else None
+        # HTTP/2 (negotiated via ALPN) multiplexes concurrent calls on one connection
+        self._http = httpx.AsyncClient(
+            base_url=configuration.host,
+            http2=True,
+            verify=verify,
+            proxy=configuration.proxy,
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def _request(self, method: str, path: str, body: Optional[dict] = None) -> dict:
+        headers = {"Accept": "application/json"}
+        # Runs the SDK's refresh hook, so rotated service-account tokens are picked up
+        authorization = self._configuration.get_api_key_with_prefix("authorization")
+        if authorization:
+            headers["Authorization"] = authorization
+        content = None
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+            content = orjson.dumps(body)
+
+        response = await self._http.request(
+            method, path, content=content, headers=headers, extensions=self._extensions
+        )
+        if not response.is_success:
+            exc = ApiException(status=response.status_code, reason=response.reason_phrase)
+            exc.body = response.text
+            raise exc
+        return orjson.loads(response.content)
+
+    async def get_namespaced_custom_object(
+        self, group: str, version: str, namespace: str, plural: str, name: str
+    ) -> dict:
+        return await self._request("GET", f"/apis/{group}/{version}/namespaces/{namespace}/{plural}/{name}")
+
+    async def create_namespaced_custom_object(
+        self, group: str, version: str, namespace: str, plural: str, body: dict
+    ) -> dict:
+        return await self._request("POST", f"/apis/{group}/{version}/namespaces/{namespace}/{plural}", body)
+
+    async def delete_namespaced_custom_object(
+        self, group: str, version: str, namespace: str, plural: str, name: str
+    ) -> dict:
+        return await self._request("DELETE", f"/apis/{group}/{version}/namespaces/{namespace}/{plural}/{name}")
+
+
+# Built in the app lifespan from K8S_CUSTOM_API's configuration
+K8S_ASYNC_CUSTOM_API: Optional[AsyncCustomObjectsApi] = None
+
 # --------------------------------------------------------------------------- #
-# Supabase Client Setup
+# Supabase Setup
 # --------------------------------------------------------------------------- #
 # Get the directory where main.py is located
 script_dir = Path(__file__).resolve().parent
@@ -109,19 +330,28 @@ load_dotenv(dotenv_path=dotenv_path, override=True)
 
 SUPABASE_URL: Optional[str] = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY: Optional[str] = os.environ.get("SUPABASE_KEY")
-SUPABASE_CLIENT: Optional[Client] = None
 
+# Supabase is only reached through its PostgREST endpoint, over the shared HTTP_CLIENT.
+# The table URL and auth headers never change, so build them once.
+SUPABASE_INSTANCES_URL: Optional[str] = None
+SUPABASE_HEADERS: dict[str, str] = {}
 if SUPABASE_URL and SUPABASE_KEY:
-    try:
-        SUPABASE_CLIENT = create_client(SUPABASE_URL, SUPABASE_KEY)
-        LOG.info("Successfully initialized Supabase client.")
-    except Exception as e:
-        LOG.critical(f"Failed to initialize Supabase client: {e}")
-        # Depending on requirements, you might want to prevent startup
-        # raise RuntimeError(f"Failed to initialize Supabase client: {e}")
+    SUPABASE_INSTANCES_URL = f"{SUPABASE_URL.rstrip('/')}/rest/v1/cyberdesk_instances"
+    SUPABASE_HEADERS = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Prefer": "return=representation",
+        "Content-Type": "application/json",
+    }
+    LOG.info("Supabase integration enabled for %s", SUPABASE_URL)
 else:
     LOG.warning("SUPABASE_URL or SUPABASE_KEY environment variables not set. Supabase integration disabled.")
 
+# Ready signals are written to Supabase by a background worker, with retries
+SUPABASE_UPDATE_ATTEMPTS = 4
+SUPABASE_UPDATE_BACKOFF = 0.5 # seconds, doubled after each failed attempt
+SUPABASE_DRAIN_TIMEOUT = 5.0 # seconds to flush queued updates on shutdown
+
 
 # --------------------------------------------------------------------------- #
 # Pydantic DTOs
@@ -135,6 +365,14 @@ class CyberdeskCreateRequest(BaseModel):
         default=DEFAULT_TIMEOUT_MS, alias="timeoutMs", ge=60_000
     )
 
+class CyberdeskBatchItem(CyberdeskCreateRequest):
+    """One desk in POST /cyberdesk:batch"""
+    id: str
+
+class CyberdeskBatchCreateRequest(BaseModel):
+    """Payload for POST /cyberdesk:batch"""
+    desks: List[CyberdeskBatchItem] = Field(min_length=1, max_length=100)
+
 class CommandRequest(BaseModel):
     """Payload for POST /cyberdesk/{vm_id}/execute-command"""
     command: str
@@ -145,6 +383,16 @@ class CyberdeskCreateResponse(BaseModel):
     """Response for POST /cyberdesk/{vm_id}"""
     id: str
 
+class CyberdeskBatchResult(BaseModel):
+    """Outcome for one desk in POST /cyberdesk:batch"""
+    id: str
+    status: str  # "created", "exists" or "error"
+    detail: Optional[str] = None
+
+class CyberdeskBatchCreateResponse(BaseModel):
+    """Response for POST /cyberdesk:batch"""
+    results: List[CyberdeskBatchResult]
+
 class StatusMessageResponse(BaseModel):
     """Generic response model for status and message."""
     status: str
@@ -162,6 +410,8 @@ class VMCommandExecutionResponse(BaseModel):
     stderr: str
     duration_s: float
 
+VM_COMMAND_RESPONSE_FIELDS = frozenset(VMCommandExecutionResponse.model_fields)
+
 class GatewayCommandResponse(BaseModel):
     """Response for POST /cyberdesk/{vm_id}/execute-command"""
     status: str
@@ -182,20 +432,188 @@ class VmHealthCheckResponse(BaseModel):
 # FastAPI application
 # --------------------------------------------------------------------------- #
 
-app = FastAPI(title="Cyberdesk API Gateway", version="1.0")
+# Shared, keep-alive pooled client for VM pods and Supabase REST (opened in lifespan)
+HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+# (instances_url, vm_id, stream_url) waiting to be written by _supabase_update_worker
+SUPABASE_UPDATES: Optional[asyncio.Queue[tuple[str, str, str]]] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own the shared HTTP client and background watchers for the app's lifetime."""
+    global HTTP_CLIENT, K8S_ASYNC_CUSTOM_API, SUPABASE_UPDATES
+    HTTP_CLIENT = httpx.AsyncClient(
+        # Retries would replay non-idempotent commands; fail fast and let callers decide
+        transport=httpx.AsyncHTTPTransport(
+            retries=0,
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        ),
+        timeout=httpx.Timeout(10.0, connect=VM_CONNECT_TIMEOUT),
+    )
+    supabase_updates = SUPABASE_UPDATES = asyncio.Queue()
+    supabase_worker = asyncio.create_task(_supabase_update_worker(supabase_updates), name="supabase-updates")
+    if K8S_CUSTOM_API is not None:
+        K8S_ASYNC_CUSTOM_API = AsyncCustomObjectsApi(K8S_CUSTOM_API.api_client.configuration)
+    pod_watch: Optional[watch.Watch] = None
+    stop_watch = threading.Event()
+    # Pods are only looked up when proxying through the K8s API (local mode)
+    if K8S_CORE_V1_API is not None and not IN_CLUSTER:
+        pod_watch = watch.Watch()
+        threading.Thread(
+            target=_watch_virt_launcher_pods,
+            args=(K8S_CORE_V1_API, asyncio.get_running_loop(), pod_watch, stop_watch),
+            name="virt-launcher-pod-watch",
+            daemon=True,
+        ).start()
+    try:
+        yield
+    finally:
+        stop_watch.set()
+        if pod_watch is not None:
+            pod_watch.stop()
+        # Give queued ready signals a moment to land before the client goes away
+        try:
+            await asyncio.wait_for(supabase_updates.join(), SUPABASE_DRAIN_TIMEOUT)
+        except TimeoutError:
+            LOG.warning("Dropping %d pending Supabase update(s) on shutdown", supabase_updates.qsize())
+        SUPABASE_UPDATES = None
+        # Wait for the worker to unwind so no PATCH is in flight when the client closes
+        supabase_worker.cancel()
+        await asyncio.gather(supabase_worker, return_exceptions=True)
+        await HTTP_CLIENT.aclose()
+        HTTP_CLIENT = None
+        if K8S_ASYNC_CUSTOM_API is not None:
+            await K8S_ASYNC_CUSTOM_API.aclose()
+        K8S_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(
+    title="Cyberdesk API Gateway",
+    version="1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 # Optional: allow the browser UI to be hosted from another domain.
+# Comma-separated; blanks and stray whitespace are ignored, "*" allows any origin.
+# A frozenset, so CORSMiddleware's `origin in allow_origins` check is a hash lookup.
+CORS_ALLOW_ORIGINS: frozenset[str] = frozenset(
+    origin.strip()
+    for origin in os.getenv("CYBERDESK_CORS_ALLOW_ORIGINS", "*").split(",")
+    if origin.strip()
+) or frozenset({"*"})
+if "*" in CORS_ALLOW_ORIGINS:
+    CORS_ALLOW_ORIGINS = frozenset({"*"})
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=os.getenv("CYBERDESK_CORS_ALLOW_ORIGINS", "*").split(","),
-    allow_methods=["*"],
+    allow_origins=CORS_ALLOW_ORIGINS,
+    allow_methods=["GET", "POST", "OPTIONS"],
+    # Clients send their own headers (e.g. x-api-key); don't fail their preflights
     allow_headers=["*"],
 )
 
 # Static noVNC artefacts live relative to this file.
 BASE_DIR = Path(__file__).resolve().parent
 NOVNC_DIR = BASE_DIR / "noVNC"
-app.mount("/static", StaticFiles(directory=NOVNC_DIR), name="static")
+# noVNC's asset names aren't content-hashed, so browsers may reuse them for a day
+# and then revalidate with the ETag StaticFiles already sends. The page itself is
+# always revalidated so a redeploy is picked up immediately.
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+VNC_HTML_CACHE_CONTROL = "no-cache"
+# The image is immutable, so read the page once and serve it from memory
+VNC_HTML: bytes = (NOVNC_DIR / "vnc.html").read_bytes()
+VNC_HTML_DIGEST = hashlib.md5(VNC_HTML, usedforsecurity=False).hexdigest()
+VNC_HTML_ETAG = f'"{VNC_HTML_DIGEST}"'
+VNC_HTML_HEADERS = {"Cache-Control": VNC_HTML_CACHE_CONTROL, "ETag": VNC_HTML_ETAG, "Vary": "Accept-Encoding"}
+VNC_HTML_GZ: bytes = gzip.compress(VNC_HTML, compresslevel=9)
+VNC_HTML_GZ_ETAG = f'"{VNC_HTML_DIGEST}-gzip"'
+VNC_HTML_GZ_HEADERS = {
+    "Cache-Control": VNC_HTML_CACHE_CONTROL,
+    "ETag": VNC_HTML_GZ_ETAG,
+    "Vary": "Accept-Encoding",
+    "Content-Encoding": "gzip",
+}
+# Assets the image build precompressed to a ".gz" sibling (see Dockerfile)
+GZIPPED_ASSETS: frozenset[str] = frozenset(
+    str(gz.relative_to(NOVNC_DIR).with_suffix("")) for gz in NOVNC_DIR.rglob("*.gz")
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """
+    Whether an Accept-Encoding header allows gzip: listed (or covered by ``*``)
+    with a non-zero q-value. An explicit gzip entry overrides ``*``.
+    """
+    if not accept_encoding:
+        return False
+    wildcard: Optional[bool] = None
+    for entry in accept_encoding.split(","):
+        coding, _, params = entry.partition(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "x-gzip", "*"):
+            continue
+        accepted = True
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    accepted = float(value) > 0
+                except ValueError:
+                    accepted = False
+        if coding == "*":
+            wildcard = accepted
+        else:
+            return accepted
+    return bool(wildcard)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches *etag* (RFC 9110 §13.1.2): ``*``,
+    or any listed tag under weak comparison, i.e. ignoring ``W/`` prefixes.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that adds a Cache-Control header to the files it serves and
+    serves the precompressed ".gz" sibling to clients that accept gzip.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response: Optional[Response] = None
+        if path in GZIPPED_ASSETS and scope["method"] in ("GET", "HEAD"):
+            request_headers = Headers(scope=scope)
+            if _accepts_gzip(request_headers.get("accept-encoding")):
+                full_path, stat_result = await asyncio.to_thread(self.lookup_path, f"{path}.gz")
+                if stat_result is not None:
+                    response = FileResponse(
+                        full_path,
+                        stat_result=stat_result,
+                        media_type=mimetypes.guess_type(path)[0],
+                        headers={"Content-Encoding": "gzip"},
+                    )
+                    if self.is_not_modified(response.headers, request_headers):
+                        response = NotModifiedResponse(response.headers)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers.setdefault("Cache-Control", STATIC_CACHE_CONTROL)
+            if path in GZIPPED_ASSETS:
+                response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+app.mount("/static", CachedStaticFiles(directory=NOVNC_DIR), name="static")
 
 
 # --------------------------------------------------------------------------- #
@@ -204,14 +622,23 @@ app.mount("/static", StaticFiles(directory=NOVNC_DIR), name="static")
 
 
 @app.get("/vnc/{vm_id}", include_in_schema=False)
-async def serve_novnc(vm_id: str) -> FileResponse:
+async def serve_novnc(
+    vm_id: str,
+    if_none_match: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+) -> Response:
     """
     Serve the main noVNC HTML page.
 
     The client-side JavaScript will subsequently establish a WebSocket
     back to `/vnc/ws/{vm_id}`.
     """
-    return FileResponse(NOVNC_DIR / "vnc.html")
+    body, headers = VNC_HTML, VNC_HTML_HEADERS
+    if _accepts_gzip(accept_encoding):
+        body, headers = VNC_HTML_GZ, VNC_HTML_GZ_HEADERS
+    if _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="text/html", headers=headers)
 
 
 # --------------------------------------------------------------------------- #
@@ -219,18 +646,120 @@ async def serve_novnc(vm_id: str) -> FileResponse:
 # --------------------------------------------------------------------------- #
 
 async def _relay(
-    recv: Callable[[], Awaitable[bytes]],
+    source: AsyncIterator[bytes],
     send: Callable[[bytes], Awaitable[None]],
 ) -> None:
     """
-    Copy bytes from *recv* to *send* until EOF or a normal WebSocket shutdown.
+    Forward frames from *source* to *send* until EOF or a normal WebSocket
+    shutdown.
+
+    A reader task keeps pulling frames while a send is in flight; whatever
+    queued up meanwhile goes out as one message of about VNC_COALESCE_BYTES.
+    RFB is a byte stream, so frame boundaries don't matter to either end. A
+    lone or already large frame is forwarded as-is without copying.
     """
+    frames: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=VNC_RELAY_QUEUE)
+
+    async def pump() -> None:
+        try:
+            async for frame in source:
+                await frames.put(frame)
+        except (WebSocketDisconnect, websockets.exceptions.ConnectionClosed):
+            pass
+        finally:
+            # Wake the writer on EOF or error; if we were cancelled it's already gone
+            if not asyncio.current_task().cancelling():
+                await frames.put(None)
+
+    reader = asyncio.create_task(pump())
     try:
-        while True:
-            await send(await recv())
+        eof = False
+        while not eof:
+            frame = await frames.get()
+            if frame is None:
+                break
+            if len(frame) < VNC_COALESCE_BYTES and not frames.empty():
+                batch = [frame]
+                size = len(frame)
+                while size < VNC_COALESCE_BYTES and not frames.empty():
+                    more = frames.get_nowait()
+                    if more is None:
+                        eof = True
+                        break
+                    batch.append(more)
+                    size += len(more)
+                frame = b"".join(batch)
+            await send(frame)
+        # Surface anything other than a clean close from the reader
+        await reader
     except (WebSocketDisconnect, websockets.exceptions.ConnectionClosed):
         # A graceful close on either side ends the task.
         return
+    finally:
+        reader.cancel()
+        # Let the reader finish unwinding; its outcome was already handled above
+        await asyncio.gather(reader, return_exceptions=True)
+
+
+def _set_nodelay(transport: asyncio.BaseTransport) -> None:
+    """
+    Disable Nagle on *transport*'s socket so coalesced relay sends go out at once.
+
+    asyncio and uvloop already do this for TCP transports they create; setting it
+    explicitly keeps the relay's latency independent of the loop implementation.
+    On Linux, delayed ACKs are also switched off for the connection's start, so
+    the VNC handshake's small request/response exchanges aren't held back.
+    """
+    sock = transport.get_extra_info("socket")
+    if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if hasattr(socket, "TCP_QUICKACK"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+
+async def _iter_browser_frames(websocket: WebSocket) -> AsyncIterator[bytes]:
+    """
+    Yield binary frames from an accepted browser WebSocket until it disconnects
+    or sends a text frame, which closes it with 1003.
+
+    Equivalent to websocket.iter_bytes() but reads the ASGI receive channel
+    directly, skipping Starlette's per-message state checks and method hops.
+    This relies on the private ``WebSocket._receive`` attribute, which is why
+    starlette is pinned exactly in requirements.txt.
+    """
+    receive = websocket._receive
+    while True:
+        message = await receive()
+        if message["type"] == "websocket.disconnect":
+            websocket.client_state = WebSocketState.DISCONNECTED
+            return
+        frame = message.get("bytes")
+        if frame is None:
+            # RFB is binary-only; refuse text frames as iter_bytes() callers did
+            await websocket.close(code=1003, reason="VNC proxy accepts binary frames only")
+            return
+        yield frame
+
+
+def _browser_frame_sender(websocket: WebSocket) -> Callable[[bytes], Awaitable[None]]:
+    """
+    Return a send_bytes() equivalent for an accepted browser WebSocket that
+    hands frames straight to the ASGI send channel.
+
+    Like _iter_browser_frames this uses a private attribute,
+    ``WebSocket._send``; starlette is pinned exactly for that reason.
+    """
+    send = websocket._send
+
+    async def send_frame(frame: bytes) -> None:
+        try:
+            await send({"type": "websocket.send", "bytes": frame})
+        except OSError:
+            # Same mapping Starlette applies when the client has gone away
+            websocket.application_state = WebSocketState.DISCONNECTED
+            raise WebSocketDisconnect(code=1006)
+
+    return send_frame
 
 
 @app.websocket("/vnc/ws/{vm_id}")
@@ -245,13 +774,10 @@ async def proxy_vnc(websocket: WebSocket, vm_id: str) -> None:
     LOG.info("VNC WebSocket opened for instance ID: %s", vm_id)
 
     target_uri: Optional[str] = None
-    target_port = 5901 # Standard VNC port
 
     try:
         # --- Step 1: Determine Environment ---
-        token_path = Path("/var/run/secrets/kubernetes.io/serviceaccount/token")
-        in_cluster = token_path.exists()
-        LOG.info(f"Running in-cluster: {in_cluster}")
+        LOG.info("Running in-cluster: %s", IN_CLUSTER)
 
         # --- Step 2: Get CR & VMI for validation (and IP if in-cluster) ---
         k8s_custom = require_k8s() # Ensure K8S client is available
@@ -259,7 +785,7 @@ async def proxy_vnc(websocket: WebSocket, vm_id: str) -> None:
         vmi_ip: Optional[str] = None
 
         try:
-            cr = k8s_custom.get_namespaced_custom_object(
+            cr = await k8s_custom.get_namespaced_custom_object(
                 group=CYBERDESK_GROUP,
                 version=CYBERDESK_VERSION,
                 namespace=CYBERDESK_NAMESPACE,
@@ -282,7 +808,7 @@ async def proxy_vnc(websocket: WebSocket, vm_id: str) -> None:
             return
 
         try:
-            vmi = k8s_custom.get_namespaced_custom_object(
+            vmi = await k8s_custom.get_namespaced_custom_object(
                 group=KUBEVIRT_GROUP,
                 version=KUBEVIRT_VERSION,
                 namespace=VMI_NAMESPACE,
@@ -295,7 +821,7 @@ async def proxy_vnc(websocket: WebSocket, vm_id: str) -> None:
 
             if vmi_phase != 'Running':
                 raise ValueError(f"Target VMI '{vm_name}' is not Running (phase: {vmi_phase}).")
-            if in_cluster and not vmi_ip:
+            if IN_CLUSTER and not vmi_ip:
                 # Only strictly need IP if in-cluster
                 raise ValueError(f"Target VMI '{vm_name}' is Running but has no IP address (needed for in-cluster connection)." )
             LOG.info("Target VMI '%s' is Running. IP: %s", vm_name, vmi_ip if vmi_ip else "N/A (local)")
@@ -311,43 +837,45 @@ async def proxy_vnc(websocket: WebSocket, vm_id: str) -> None:
             return
 
         # --- Step 3: Determine Target URI based on environment ---
-        if in_cluster:
+        if IN_CLUSTER:
             if not vmi_ip: # Should have been caught above, but defensive check
                  raise ValueError("Logic error: In-cluster but VMI IP is missing.")
-            target_uri = f"ws://{vmi_ip}:{target_port}"
+            target_uri = f"ws://{vmi_ip}:{VNC_PORT}"
             LOG.info("Connecting via VMI IP (in-cluster): %s", target_uri)
         else:
-            # Assume manual port-forward `kubectl port-forward pod/<vmi-pod> 5901:5901` is running
-            target_uri = f"ws://host.docker.internal:{target_port}"
+            target_uri = LOCAL_VNC_URI
             LOG.info("Connecting via Docker host (local): %s (Requires manual port-forward)", target_uri)
 
         # --- Step 4: Establish connection and relay ---
         LOG.info("Attempting WebSocket connection to VMI VNC at %s", target_uri)
-        async with websockets.connect(target_uri, ping_interval=None, open_timeout=10) as vmi_ws:
+        # RFB framebuffer updates routinely exceed the 1 MiB default frame cap and
+        # are already compressed by the VNC encoder, so lift the cap, skip
+        # permessage-deflate, and allow a deeper write buffer before backpressure.
+        async with websockets.connect(
+            target_uri,
+            ping_interval=VNC_PING_INTERVAL,
+            ping_timeout=VNC_PING_INTERVAL * 2,
+            open_timeout=10,
+            max_size=None,
+            compression=None,
+            write_limit=2**20,
+        ) as vmi_ws:
             LOG.info("Successfully connected to VMI VNC at %s", target_uri)
+            _set_nodelay(vmi_ws.transport)
 
-            # Start two tasks to relay messages in both directions
-            consumer_task = asyncio.create_task(
-                _relay(websocket.receive_bytes, vmi_ws.send)
-            )
-            producer_task = asyncio.create_task(
-                _relay(vmi_ws.recv, websocket.send_bytes) # type: ignore[arg-type] -- websockets.recv() returns Data
-            )
-
-            # Wait for either task to complete (or raise an exception)
-            done, pending = await asyncio.wait(
-                [consumer_task, producer_task],
-                return_when=asyncio.FIRST_COMPLETED,
-            )
-
-            # Cancel pending tasks to clean up resources
-            for task in pending:
-                task.cancel()
-
-            # Raise exceptions if any task failed
-            for task in done:
-                if task.exception():
-                    raise task.exception()
+            # Relay both directions; when either side finishes, cancel the other and
+            # let the TaskGroup wait for it before the upstream socket is closed.
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    relays = (
+                        tg.create_task(_relay(_iter_browser_frames(websocket), vmi_ws.send)),
+                        tg.create_task(_relay(vmi_ws, _browser_frame_sender(websocket))), # type: ignore[arg-type] -- websockets yields Data
+                    )
+                    for relay in relays:
+                        relay.add_done_callback(lambda _: [t.cancel() for t in relays])
+            except ExceptionGroup as eg:
+                # Surface the first relay failure to the handlers below
+                raise eg.exceptions[0]
 
     except (websockets.exceptions.ConnectionClosedError, websockets.exceptions.ConnectionClosedOK) as e:
         LOG.info("VNC WebSocket connection closed cleanly: %s", e)
@@ -369,14 +897,14 @@ async def proxy_vnc(websocket: WebSocket, vm_id: str) -> None:
 # --------------------------------------------------------------------------- #
 
 
-def require_k8s() -> CustomObjectsApi:
-    """Return a live CustomObjectsApi or raise 503 HTTPException."""
-    if K8S_CUSTOM_API is None:
+def require_k8s() -> AsyncCustomObjectsApi:
+    """Return a live AsyncCustomObjectsApi or raise 503 HTTPException."""
+    if K8S_ASYNC_CUSTOM_API is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Kubernetes client not configured.",
         )
-    return K8S_CUSTOM_API
+    return K8S_ASYNC_CUSTOM_API
 
 def require_k8s_core() -> CoreV1Api:
     """Return a live CoreV1Api or raise 503 HTTPException."""
@@ -387,76 +915,104 @@ def require_k8s_core() -> CoreV1Api:
         )
     return K8S_CORE_V1_API
 
-def require_supabase() -> Client:
-    """Return a live Supabase client or raise 503 HTTPException."""
+def require_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client or raise 503 HTTPException outside the app lifespan."""
+    if HTTP_CLIENT is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="HTTP client not initialised.",
+        )
+    return HTTP_CLIENT
+
+def require_supabase() -> str:
+    """Return the PostgREST URL of the instances table or raise 503 HTTPException."""
     
-    if SUPABASE_CLIENT is None:
+    if SUPABASE_INSTANCES_URL is None:
          raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Supabase client not configured (missing SUPABASE_URL/KEY env vars?).",
         )
-    return SUPABASE_CLIENT
+    return SUPABASE_INSTANCES_URL
 
 # --- Helper Function to Update Supabase ---
-async def update_supabase_instance(vm_id: str, stream_url: str):
+async def update_supabase_instance(instances_url: str, vm_id: str, stream_url: str):
     """Updates the Supabase instance entry with stream URL and status."""
-    supabase_client = require_supabase()
+    http_client = require_http_client()
     try:
-        # Run blocking Supabase call in a separate thread
-        # Assign the entire response object
-        response = await asyncio.to_thread(
-            lambda: supabase_client.table("cyberdesk_instances")
-            .update({"status": "running", "stream_url": stream_url})
-            .eq("id", vm_id)
-            .execute()
+        # PATCH the row through PostgREST directly; no SDK, no worker thread
+        response = await http_client.patch(
+            instances_url,
+            params={"id": f"eq.{vm_id}"},
+            headers=SUPABASE_HEADERS,
+            content=orjson.dumps({"status": "running", "stream_url": stream_url}),
+            timeout=10.0, # Remote TLS endpoint; don't apply the VM connect budget
         )
-        # Log the actual response structure for clarity (can be removed later)
-        LOG.info(f"Supabase raw response object for {vm_id}: {response}")
-
-        # Access the data list via response.data
-        updated_data = response.data
-        # Access count via response.count (though not strictly needed for the check here)
-        # updated_count = response.count
+        response.raise_for_status()
 
-        LOG.info(f"Supabase update response for {vm_id}: data={updated_data}, count={getattr(response, 'count', 'N/A')}")
+        # With return=representation PostgREST echoes the updated rows
+        updated_data = orjson.loads(response.content)
+        LOG.info("Supabase update response for %s: status=%s, %d bytes", vm_id, response.status_code, len(response.content))
+        LOG.debug("Supabase update data for %s: %s", vm_id, updated_data)
 
         # Check if the update was successful using the actual data list
         if isinstance(updated_data, list) and len(updated_data) > 0 and updated_data[0]:
-            LOG.info(f"Successfully updated Supabase for instance {vm_id}")
+            LOG.info("Successfully updated Supabase for instance %s", vm_id)
             return True
         else:
             # This might happen if the row doesn't exist or based on Supabase return preferences
-            LOG.warning(f"Supabase update for instance {vm_id} completed, but response data indicates no rows updated or an unexpected format: {updated_data}")
+            LOG.warning("Supabase update for instance %s completed, but response data indicates no rows updated or an unexpected format: %s", vm_id, updated_data)
             return False
     except Exception as e:
-        LOG.exception(f"Error updating Supabase for instance {vm_id}: {e}")
+        LOG.exception("Error updating Supabase for instance %s: %s", vm_id, e)
         return False
 
+async def _supabase_update_worker(updates: asyncio.Queue[tuple[str, str, str]]) -> None:
+    """Drain *updates*, retrying each Supabase update with exponential backoff."""
+    while True:
+        instances_url, vm_id, stream_url = await updates.get()
+        try:
+            delay = SUPABASE_UPDATE_BACKOFF
+            for attempt in range(1, SUPABASE_UPDATE_ATTEMPTS + 1):
+                if await update_supabase_instance(instances_url, vm_id, stream_url):
+                    break
+                if attempt == SUPABASE_UPDATE_ATTEMPTS:
+                    LOG.error("Giving up on Supabase update for %s after %d attempts", vm_id, attempt)
+                    break
+                await asyncio.sleep(delay)
+                delay *= 2
+        finally:
+            updates.task_done()
+
+async def _create_cyberdesk_cr(api: AsyncCustomObjectsApi, vm_id: str, timeout_ms: int) -> dict:
+    """Create one Cyberdesk CR; ApiException propagates to the caller."""
+    body = {
+        "apiVersion": f"{CYBERDESK_GROUP}/{CYBERDESK_VERSION}",
+        "kind": "Cyberdesk",
+        "metadata": {"name": vm_id, "namespace": CYBERDESK_NAMESPACE},
+        "spec": {"timeoutMs": timeout_ms},
+    }
+    return await api.create_namespaced_custom_object(
+        group=CYBERDESK_GROUP,
+        version=CYBERDESK_VERSION,
+        namespace=CYBERDESK_NAMESPACE,
+        plural=CYBERDESK_PLURAL,
+        body=body,
+    )
+
 @app.post(
     "/cyberdesk/{vm_id}",
     status_code=status.HTTP_201_CREATED,
     response_model=CyberdeskCreateResponse
 )
-async def create_cyberdesk(vm_id: str, payload: CyberdeskCreateRequest):
+async def create_cyberdesk(
+    vm_id: str,
+    payload: CyberdeskCreateRequest,
+    api: AsyncCustomObjectsApi = Depends(require_k8s),
+):
     """Create a Cyberdesk CR in the cluster."""
-    api = require_k8s()
-
-    body = {
-        "apiVersion": f"{CYBERDESK_GROUP}/{CYBERDESK_VERSION}",
-        "kind": "Cyberdesk",
-        "metadata": {"name": vm_id, "namespace": CYBERDESK_NAMESPACE},
-        "spec": {"timeoutMs": payload.timeout_ms},
-    }
 
     try:
-        resp = await asyncio.to_thread(
-            api.create_namespaced_custom_object,
-            group=CYBERDESK_GROUP,
-            version=CYBERDESK_VERSION,
-            namespace=CYBERDESK_NAMESPACE,
-            plural=CYBERDESK_PLURAL,
-            body=body,
-        )
+        resp = await _create_cyberdesk_cr(api, vm_id, payload.timeout_ms)
         return {"id": resp["metadata"]["name"]}
     except ApiException as exc:
         LOG.error("Kubernetes API error: %s", exc, exc_info=False)
@@ -465,25 +1021,59 @@ async def create_cyberdesk(vm_id: str, payload: CyberdeskCreateRequest):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=exc.reason) from exc
 
 
+@app.post(
+    "/cyberdesk:batch",
+    status_code=status.HTTP_200_OK,
+    response_model=CyberdeskBatchCreateResponse
+)
+async def create_cyberdesk_batch(
+    payload: CyberdeskBatchCreateRequest,
+    api: AsyncCustomObjectsApi = Depends(require_k8s),
+):
+    """
+    Create several Cyberdesk CRs concurrently.
+
+    Creates run in parallel over the async apiserver client, so a batch costs
+    roughly one round-trip rather than one per desk. Each desk gets its own
+    result; one failure doesn't fail the batch.
+    """
+    outcomes = await asyncio.gather(
+        *(_create_cyberdesk_cr(api, desk.id, desk.timeout_ms) for desk in payload.desks),
+        return_exceptions=True,
+    )
+
+    results = []
+    for desk, outcome in zip(payload.desks, outcomes):
+        if not isinstance(outcome, BaseException):
+            results.append({"id": desk.id, "status": "created"})
+        elif isinstance(outcome, ApiException) and outcome.status == 409:
+            results.append({"id": desk.id, "status": "exists", "detail": "Already exists"})
+        else:
+            LOG.error("Batch create of Cyberdesk %s failed: %s", desk.id, outcome, exc_info=False)
+            detail = outcome.reason if isinstance(outcome, ApiException) else str(outcome)
+            results.append({"id": desk.id, "status": "error", "detail": detail})
+    return {"results": results}
+
+
 @app.post(
     "/cyberdesk/{vm_id}/stop",
     status_code=status.HTTP_200_OK,
     response_model=StatusMessageResponse
 )
-async def stop_cyberdesk(vm_id: str):
+async def stop_cyberdesk(vm_id: str, api: AsyncCustomObjectsApi = Depends(require_k8s)):
     """Delete a Cyberdesk CR from the cluster."""
-    api = require_k8s()
 
     try:
-        await asyncio.to_thread(
-            api.delete_namespaced_custom_object,
+        await api.delete_namespaced_custom_object(
             group=CYBERDESK_GROUP,
             version=CYBERDESK_VERSION,
             namespace=CYBERDESK_NAMESPACE,
             plural=CYBERDESK_PLURAL,
             name=vm_id,
-            body=client.V1DeleteOptions(),
         )
+        _POD_CACHE.pop(vm_id, None)
+        _VMI_IP_CACHE.pop(vm_id, None)
+        _VM_GET_RESULTS.pop((vm_id, VM_DAEMON_PORT, VM_HEALTH_PATH), None)
         # Return a dictionary matching the response model
         return {"status": "success", "message": f"Deletion of '{vm_id}' initiated."}
     except ApiException as exc:
@@ -495,33 +1085,27 @@ async def stop_cyberdesk(vm_id: str):
 # --- NEW Endpoint ---
 @app.post(
     "/cyberdesk/{vm_id}/ready",
-    status_code=status.HTTP_200_OK,
+    status_code=status.HTTP_202_ACCEPTED,
     response_model=CyberdeskReadyResponse
 )
-async def cyberdesk_ready(vm_id: str):
+async def cyberdesk_ready(vm_id: str, instances_url: str = Depends(require_supabase)):
     """
-    Signal that a VM is ready. Updates Supabase with the stream URL.
+    Signal that a VM is ready. Queues the Supabase update with the stream URL
+    and returns without waiting for it.
     """
-    LOG.info(f"Received ready signal for VM: {vm_id}")
+    LOG.info("Received ready signal for VM: %s", vm_id)
     # 2. Construct Stream URL
-    # Assuming default HTTP port 80 for the gateway service
-    stream_url = f"https://gateway.cyberdesk.io/vnc/{vm_id}"
-    LOG.info(f"Constructed stream URL for {vm_id}: {stream_url}")
+    stream_url = STREAM_URL_PREFIX + vm_id
+    LOG.info("Constructed stream URL for %s: %s", vm_id, stream_url)
 
-    # 3. Update Supabase
-    success = await update_supabase_instance(vm_id, stream_url)
-
-    if success:
-        LOG.info(f"Successfully processed ready signal for {vm_id}")
-        # Return a dictionary matching the response model
-        return {"status": "success", "message": f"Instance {vm_id} marked as running.", "stream_url": stream_url}
+    # 3. Hand the Supabase update to the background worker
+    if SUPABASE_UPDATES is not None:
+        SUPABASE_UPDATES.put_nowait((instances_url, vm_id, stream_url))
     else:
-        LOG.error(f"Failed to update Supabase for {vm_id} after getting IP.")
-        # Indicate failure - maybe the instance ID was wrong or DB issue
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to update instance status in database for {vm_id}."
-        )
+        # No worker outside the app lifespan; write it inline rather than drop it
+        LOG.warning("Supabase update queue not running; updating %s inline", vm_id)
+        await update_supabase_instance(instances_url, vm_id, stream_url)
+    return {"status": "accepted", "message": f"Instance {vm_id} will be marked as running.", "stream_url": stream_url}
 
 @app.post(
     "/cyberdesk/{vm_id}/execute-command",
@@ -532,56 +1116,59 @@ async def execute_vm_command(vm_id: str, payload: CommandRequest):
     Sends a command string to the execute-command endpoint of the specified VM
     using the proxy helper.
     """
-    command_port = 8000
-    command_path = "execute-command" # Path on the VM service
-    command_timeout = 30.0 # Longer timeout for potential command execution
-
     command_to_execute = payload.command
     # IMPORTANT: Ensure the receiving service expects this JSON structure
     request_payload = {"cmd": command_to_execute}
 
-    LOG.info(f"Attempting command execution for VM {vm_id}: '{command_to_execute[:80]}...'")
+    LOG.info("Attempting command execution for VM %s: '%.80s...'", vm_id, command_to_execute)
 
     try:
         status_code, response_json = await _proxy_request_to_vm(
             vmid=vm_id,
-            port=command_port,
-            path=command_path,
+            port=VM_DAEMON_PORT,
+            path=VM_COMMAND_PATH,
             method="POST",
             json_payload=request_payload,
-            timeout=command_timeout
+            timeout=VM_COMMAND_TIMEOUT
         )
 
         # Check if the VM's command endpoint returned a success status
         if 200 <= status_code < 300:
-            LOG.info(f"Command execution for {vm_id} successful: {status_code}, Response: { response_json}")
-            return {
+            if not isinstance(response_json, dict) or not VM_COMMAND_RESPONSE_FIELDS <= response_json.keys():
+                LOG.error("VM %s returned an unexpected command response: %.200r", vm_id, response_json)
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"VM {vm_id} returned an unexpected command response.",
+                )
+            LOG.info(
+                "Command execution for %s successful: %s, return_code=%s, stdout=%d chars, stderr=%d chars",
+                vm_id, status_code, response_json["return_code"],
+                len(response_json["stdout"]), len(response_json["stderr"]),
+            )
+            LOG.debug("Command response for %s: %s", vm_id, response_json)
+            # Forward the already-parsed VM payload as-is instead of rebuilding it
+            # and letting the response model re-validate/re-serialize it.
+            return ORJSONResponse({
                 "status": "success",
                 "vm_status_code": status_code,
-                "vm_response": {
-                    "args": response_json["args"],
-                    "return_code": response_json["return_code"],
-                    "stdout": response_json["stdout"],
-                    "stderr": response_json["stderr"],
-                    "duration_s": response_json["duration_s"]
-                }
-            }
+                "vm_response": response_json,
+            })
         else:
             # VM is reachable, but the command endpoint returned an error
-            LOG.error(f"VM {vm_id} command execution failed with status {status_code}.")
+            LOG.error("VM %s command execution failed with status %s.", vm_id, status_code)
             raise HTTPException(
                 status_code=502, # Bad Gateway, as the upstream VM endpoint failed
-                detail=f"VM {vm_id} command execution failed: {status_code}",
+                detail=f"VM {vm_id} command execution failed: {status_code} {str(response_json)[:512]}",
                 headers={"X-VM-Status-Code": str(status_code)}
             )
 
     except HTTPException as e:
          # Re-raise known HTTP exceptions from the proxy helper
-         LOG.error(f"Command execution failed for {vm_id} due to proxy error: {e.status_code} - {e.detail}")
+         LOG.error("Command execution failed for %s due to proxy error: %s - %s", vm_id, e.status_code, e.detail)
          raise e
     except Exception as e:
         # Catch any other unexpected errors during the process
-        LOG.exception(f"Unexpected error during command execution processing for {vm_id}: {e}")
+        LOG.exception("Unexpected error during command execution processing for %s: %s", vm_id, e)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during command execution for VM {vm_id}")
 
 
@@ -590,57 +1177,601 @@ async def execute_vm_command(vm_id: str, payload: CommandRequest):
 # --------------------------------------------------------------------------- #
 
 
+# The liveness body never changes, so it is encoded once
+HEALTHZ_BODY = orjson.dumps({"status": "ok"})
+
 @app.get("/healthz", response_model=HealthCheckResponse)
-async def health_check():
+async def health_check() -> Response:
     """Kubernetes livenessProbe target."""
-    return {"status": "ok"}
+    return Response(HEALTHZ_BODY, media_type="application/json")
 
 @app.get("/vm/healthcheck/{vmid}", response_model=VmHealthCheckResponse)
 async def vm_health_check(vmid: str):
     """
     Performs a health check on the specified VM instance using the proxy helper.
     """
-    health_port = 8000
-    health_path = "health"
-
     try:
         status_code, response_json = await _proxy_request_to_vm(
             vmid=vmid,
-            port=health_port,
-            path=health_path,
+            port=VM_DAEMON_PORT,
+            path=VM_HEALTH_PATH,
             method="GET",
-            timeout=10.0
+            timeout=VM_HEALTH_TIMEOUT,
+            reuse_recent=True,
         )
 
         # Check if the VM's health endpoint returned a success status
         if 200 <= status_code < 300:
-            LOG.info(f"Health check for {vmid} successful: {status_code}")
+            LOG.debug("Health check for %s successful: %s", vmid, status_code)
             return {
                 "status": "ok",
                 "vm_status_code": status_code
             }
         else:
             # VM is reachable, but reported unhealthy
-            LOG.warning(f"VM {vmid} health check failed with status {status_code}")
+            LOG.warning("VM %s health check failed with status %s", vmid, status_code)
             raise HTTPException(
                 status_code=502, # Bad Gateway, as the upstream VM is unhealthy
-                detail=f"VM {vmid} health check reported failure: {status_code}",
+                detail=f"VM {vmid} health check reported failure: {status_code} {str(response_json)[:512]}",
                 headers={"X-VM-Status-Code": str(status_code)}
             )
 
     except HTTPException as e:
          # Re-raise known HTTP exceptions from the proxy helper
          # (e.g., 404 if pod not found, 503 if connection failed, 504 timeout)
-         LOG.error(f"Health check failed for {vmid} due to proxy error: {e.status_code} - {e.detail}")
+         LOG.error("Health check failed for %s due to proxy error: %s - %s", vmid, e.status_code, e.detail)
          raise e
     except Exception as e:
         # Catch any other unexpected errors during the process
-        LOG.exception(f"Unexpected error during health check processing for {vmid}: {e}")
+        LOG.exception("Unexpected error during health check processing for %s: %s", vmid, e)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during health check for VM {vmid}")
 
 # --- Generic VM Pod Communication Helper ---
 
+# vmid -> semaphore bounding in-flight commands; only present while in use
+_VM_SEMAPHORES: dict[str, asyncio.Semaphore] = {}
+# vmid -> callers holding or waiting on that semaphore
+_VM_SEMAPHORE_USERS: dict[str, int] = {}
+
+# vmid -> (vm_name, virt-launcher pod name), for the local K8s API proxy path
+_POD_CACHE: TTLCache[str, tuple[str, str]] = TTLCache(maxsize=1024, ttl=30)
+
+# vmid -> 404 detail for desks with no Running pod, so retry storms don't relist
+_POD_MISSES: TTLCache[str, str] = TTLCache(maxsize=1024, ttl=2)
+
+# Cold desk-id lookups are gathered for this long and answered by one pod list
+POD_LOOKUP_BATCH_WINDOW = 0.01 # seconds
+# namespace -> desk id -> future for lookups waiting on the next batched list
+_POD_LOOKUP_BATCHES: dict[str, dict[str, asyncio.Future[Optional[tuple[str, str]]]]] = {}
+
+# Kubernetes label value syntax; desk ids outside it can't be in a label selector
+LABEL_VALUE_RE = re.compile(r"(([A-Za-z0-9][-A-Za-z0-9_.]*)?[A-Za-z0-9])?")
+
+# Strong references to fire-and-forget tasks, so they aren't collected mid-flight
+_BACKGROUND_TASKS: set[asyncio.Task[None]] = set()
+
+# vmid -> VMI IP, for the in-cluster proxy path. Nothing invalidates it when a
+# VMI is recreated (other replicas never see our evictions), so a stale entry can
+# reach whatever now holds that IP: only read-only health GETs use it, never
+# command POSTs. Two seconds only collapses bursts of health checks.
+VMI_IP_CACHE_TTL = float(os.getenv("CYBERDESK_VMI_IP_CACHE_TTL", "2"))
+_VMI_IP_CACHE: TTLCache[str, str] = TTLCache(maxsize=4096, ttl=VMI_IP_CACHE_TTL)
+
+# desk-id -> (vm_name, pod name) of Running virt-launcher pods, maintained by the
+# pod list+watch so most proxy requests resolve without touching the apiserver.
+_POD_INDEX: dict[str, tuple[str, str]] = {}
+
+
+def _pod_field_selector(*selectors: str) -> Optional[str]:
+    """Join pod field *selectors*, adding the spec.nodeName scope when NODE_NAME is set."""
+    if NODE_NAME:
+        selectors = (*selectors, f"spec.nodeName={NODE_NAME}")
+    return ",".join(selectors) or None
+
+
+@asynccontextmanager
+async def _vm_slot(vmid: str, method: str) -> AsyncIterator[None]:
+    """
+    Hold one of VM_MAX_IN_FLIGHT request slots for *vmid* while forwarding.
+
+    GETs (health checks) skip the bound so they never queue behind long
+    commands. The semaphore is dropped once nobody holds or waits on it, so
+    desks that go away don't leave entries behind.
+    """
+    if method == "GET":
+        yield
+        return
+    sem = _VM_SEMAPHORES.get(vmid)
+    if sem is None:
+        sem = _VM_SEMAPHORES[vmid] = asyncio.Semaphore(VM_MAX_IN_FLIGHT)
+    _VM_SEMAPHORE_USERS[vmid] = _VM_SEMAPHORE_USERS.get(vmid, 0) + 1
+    try:
+        async with sem:
+            yield
+    finally:
+        users = _VM_SEMAPHORE_USERS.pop(vmid) - 1
+        if users:
+            _VM_SEMAPHORE_USERS[vmid] = users
+        else:
+            del _VM_SEMAPHORES[vmid]
+
+
+async def _resolve_virt_launcher_pod(
+    k8s_custom: AsyncCustomObjectsApi,
+    core_api: CoreV1Api,
+    vmid: str,
+    vm_namespace: str,
+) -> tuple[str, str]:
+    """
+    Return ``(vm_name, pod_name)`` for the Running virt-launcher pod of *vmid*.
+
+    The pod is matched on the desk-id label the operator puts on the VMI
+    template, normally straight from the watch-fed _POD_INDEX. Lookups that
+    miss the index are cached for a short TTL; the pod watch evicts entries as
+    soon as their pod stops running.
+    """
+    indexed = _POD_INDEX.get(vmid)
+    if indexed is not None:
+        return indexed
+    cached = _POD_CACHE.get(vmid)
+    if cached is not None:
+        return cached
+    missed = _POD_MISSES.get(vmid)
+    if missed is not None:
+        raise HTTPException(status_code=404, detail=missed)
+
+    try:
+        return await _lookup_virt_launcher_pod(k8s_custom, core_api, vmid, vm_namespace)
+    except HTTPException as e:
+        if e.status_code == 404:
+            _POD_MISSES[vmid] = e.detail
+        raise
+
+
+async def _find_desk_pod(core_api: CoreV1Api, vm_namespace: str, vmid: str) -> Optional[tuple[str, str]]:
+    """
+    Return ``(vm_name, pod_name)`` of the Running pod labelled with desk id
+    *vmid*, or None.
+
+    Lookups arriving within POD_LOOKUP_BATCH_WINDOW of each other are answered
+    by a single list using a set-based desk-id selector.
+    """
+    if len(vmid) > 63 or not LABEL_VALUE_RE.fullmatch(vmid):
+        # Can't be a label value, so no pod carries it; and it must never reach a shared selector
+        return None
+    batch = _POD_LOOKUP_BATCHES.get(vm_namespace)
+    if batch is None:
+        batch = _POD_LOOKUP_BATCHES[vm_namespace] = {}
+        flush = asyncio.create_task(_flush_desk_pod_lookups(core_api, vm_namespace))
+        _BACKGROUND_TASKS.add(flush)
+        flush.add_done_callback(_BACKGROUND_TASKS.discard)
+        flush.add_done_callback(functools.partial(_abandon_lookups, vm_namespace, batch))
+    pending = batch.get(vmid)
+    if pending is None:
+        pending = batch[vmid] = asyncio.get_running_loop().create_future()
+    # Shielded, so one caller giving up doesn't cancel the answer for the others
+    return await asyncio.shield(pending)
+
+
+async def _list_desk_pods(core_api: CoreV1Api, vm_namespace: str, desk_ids: List[str]) -> dict[str, tuple[str, str]]:
+    """Map each of *desk_ids* that has a Running pod to its ``(vm_name, pod_name)``."""
+    pods = await _k8s_call(
+        _list_pod_metadata,
+        core_api,
+        vm_namespace,
+        labelSelector=f"{DESK_ID_LABEL} in ({','.join(desk_ids)})",
+        fieldSelector=_pod_field_selector("status.phase=Running"),
+        resourceVersion="0",
+        resourceVersionMatch="NotOlderThan",
+    )
+    found: dict[str, tuple[str, str]] = {}
+    for metadata in pods:
+        labels = metadata.get("labels") or {}
+        # The operator sets kubevirt.io/domain alongside the desk-id label
+        found[labels.get(DESK_ID_LABEL, "")] = (labels.get(VM_DOMAIN_LABEL, ""), metadata["name"])
+    return found
+
+
+def _settle_lookup(
+    pending: asyncio.Future[Optional[tuple[str, str]]],
+    result: Optional[tuple[str, str]] = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    """Answer one queued desk lookup, unless it's already been answered."""
+    if pending.done():
+        return
+    if error is None:
+        pending.set_result(result)
+        return
+    pending.set_exception(error)
+    # Mark it retrieved: waiters that gave up would otherwise leave it unread
+    pending.exception()
+
+
+def _abandon_lookups(
+    vm_namespace: str,
+    batch: dict[str, asyncio.Future[Optional[tuple[str, str]]]],
+    _flush: asyncio.Task[None],
+) -> None:
+    """
+    Done-callback of a batch's flush task: cancel any lookup it left unanswered
+    (e.g. it was cancelled at shutdown, possibly before it ever ran) so no
+    waiter hangs, and retire the batch so later lookups start a new one.
+    """
+    if _POD_LOOKUP_BATCHES.get(vm_namespace) is batch:
+        del _POD_LOOKUP_BATCHES[vm_namespace]
+    for pending in batch.values():
+        pending.cancel()
+
+
+async def _flush_desk_pod_lookups(core_api: CoreV1Api, vm_namespace: str) -> None:
+    """
+    After POD_LOOKUP_BATCH_WINDOW, list the pods for every desk id queued by
+    _find_desk_pod and answer each waiter.
+
+    If the batched list fails, each desk id is retried on its own so one bad
+    lookup doesn't fail every waiter. Anything left unanswered when the task
+    ends is cancelled by _abandon_lookups.
+    """
+    await asyncio.sleep(POD_LOOKUP_BATCH_WINDOW)
+    batch = _POD_LOOKUP_BATCHES.pop(vm_namespace, {})
+    try:
+        found = await _list_desk_pods(core_api, vm_namespace, list(batch))
+    except Exception as e:
+        if len(batch) == 1:
+            for pending in batch.values():
+                _settle_lookup(pending, error=e)
+            return
+        LOG.warning("Batched pod list for %d desks failed (%s); retrying individually", len(batch), e)
+        for desk_id, pending in batch.items():
+            try:
+                result = (await _list_desk_pods(core_api, vm_namespace, [desk_id])).get(desk_id)
+            except Exception as single_error:
+                _settle_lookup(pending, error=single_error)
+            else:
+                _settle_lookup(pending, result)
+        return
+
+    if len(batch) > 1:
+        LOG.debug("Resolved %d desk pod lookups with one list", len(batch))
+    for desk_id, pending in batch.items():
+        _settle_lookup(pending, found.get(desk_id))
+
+
+async def _lookup_virt_launcher_pod(
+    k8s_custom: AsyncCustomObjectsApi,
+    core_api: CoreV1Api,
+    vmid: str,
+    vm_namespace: str,
+) -> tuple[str, str]:
+    """Uncached half of _resolve_virt_launcher_pod: ask the API server."""
+    # Not indexed yet (cold start or watch lag): one cache-served list on the desk-id label, no CR read.
+    try:
+        found = await _find_desk_pod(core_api, vm_namespace, vmid)
+    except ApiException as e:
+        LOG.error("K8s API error listing pods for %s: %s %s", vmid, e.status, e.reason)
+        raise HTTPException(status_code=500, detail=f"API error listing pods for Cyberdesk {vmid}: {e.reason}")
+
+    if found is not None:
+        LOG.info("Found running virt-launcher pod '%s' for Cyberdesk '%s'.", found[1], vmid)
+        _POD_CACHE[vmid] = found
+        return found
+
+    if not CR_LOOKUP_FALLBACK:
+        raise HTTPException(status_code=404, detail=f"No running VM pod labelled {DESK_ID_LABEL}={vmid}.")
+
+    return await _resolve_virt_launcher_pod_via_cr(k8s_custom, core_api, vmid, vm_namespace)
+
+
+async def _resolve_virt_launcher_pod_via_cr(
+    k8s_custom: AsyncCustomObjectsApi,
+    core_api: CoreV1Api,
+    vmid: str,
+    vm_namespace: str,
+) -> tuple[str, str]:
+    """
+    Legacy lookup for pods without the desk-id label: read the Cyberdesk CR for
+    its virtualMachineRef, then find that VM's virt-launcher pod.
+    """
+    # 1. Find the VM Name from CR
+    vm_name: Optional[str] = None
+    try:
+        cr = await k8s_custom.get_namespaced_custom_object(
+            group=CYBERDESK_GROUP,
+            version=CYBERDESK_VERSION,
+            namespace=CYBERDESK_NAMESPACE,
+            plural=CYBERDESK_PLURAL,
+            name=vmid,
+        )
+        vm_name = cr.get("status", {}).get("cyberdesk_create", {}).get("virtualMachineRef")
+        if not vm_name:
+            raise ValueError(f"virtualMachineRef not found in status for Cyberdesk {vmid}")
+        LOG.debug("Found virtualMachineRef '%s' for instance %s", vm_name, vmid)
+    except ApiException as e:
+        if e.status == 404:
+            raise HTTPException(status_code=404, detail=f"Cyberdesk CR '{vmid}' not found.") from e
+        else:
+            raise HTTPException(status_code=500, detail=f"API Error fetching Cyberdesk CR '{vmid}': {e.reason}") from e
+    except ValueError as e:
+        LOG.error(str(e))
+        raise HTTPException(status_code=404, detail=str(e))
+
+    # 2. Find the Pod Name using the VM Name
+    pod_name: Optional[str] = None
+    running_pod_found = False
+    try:
+        # Let the API server filter by the kubevirt.io/domain label that the VMI
+        # template carries onto its virt-launcher pod. resourceVersion=0 serves
+        # the list from the apiserver watch cache instead of a quorum read.
+        pods = await _k8s_call(
+            _list_pod_metadata,
+            core_api,
+            vm_namespace,
+            labelSelector=VM_DOMAIN_SELECTOR_PREFIX + vm_name,
+            fieldSelector=_pod_field_selector("status.phase=Running"),
+            resourceVersion="0",
+            resourceVersionMatch="NotOlderThan",
+        )
+        if pods:
+            pod_name = pods[0]["name"]
+            running_pod_found = True
+            LOG.info("Found running virt-launcher pod '%s' for VM '%s'.", pod_name, vm_name)
+        else:
+            # Label not present (or pod not Running): fall back to scanning annotations
+            LOG.debug("Listing pods in namespace '%s' to find one for VM '%s'.", vm_namespace, vm_name)
+            pod_list_response = await _k8s_call(
+                core_api.list_namespaced_pod,
+                namespace=vm_namespace,
+                field_selector=_pod_field_selector(),
+                _request_timeout=10 # Increase timeout slightly for list operation
+            )
+            pods = pod_list_response.items
+            LOG.debug("Found %d pods in namespace. Iterating to find match.", len(pods))
+
+            # First Running match wins; otherwise remember the newest non-Running
+            # match so the error can name it.
+            candidate: Optional[Any] = None
+            for pod in pods:
+                if (pod.metadata.annotations or {}).get(VM_DOMAIN_LABEL) != vm_name:
+                    continue
+                if pod.status.phase == "Running":
+                    pod_name = pod.metadata.name
+                    running_pod_found = True
+                    LOG.info("Found running virt-launcher pod '%s' for VM '%s'.", pod_name, vm_name)
+                    break
+                if candidate is None or pod.metadata.creation_timestamp > candidate.metadata.creation_timestamp:
+                    candidate = pod
+
+            if not running_pod_found and candidate is not None:
+                # We found a pod but it wasn't running
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"VM pod {candidate.metadata.name} for {vm_name} found but not in Running phase ({candidate.status.phase}).",
+                )
+
+        if not running_pod_found:
+            # We didn't find any pod with the matching annotation
+            LOG.warning("No virt-launcher pod found with annotation kubevirt.io/domain=%s", vm_name)
+            raise HTTPException(status_code=404, detail=f"VM pod for {vm_name} not found.")
+
+    except ApiException as e:
+        LOG.error("K8s API error listing pods for %s: %s %s", vm_name, e.status, e.reason)
+        raise HTTPException(status_code=500, detail=f"API error listing pods for VM {vm_name}: {e.reason}")
+
+    _POD_CACHE[vmid] = (vm_name, pod_name)
+    return vm_name, pod_name
+
+
+def _evict_pod(pod_name: str) -> None:
+    """Drop every cached or indexed lookup pointing at *pod_name*."""
+    for vmid, (_, cached_pod) in list(_POD_CACHE.items()):
+        if cached_pod == pod_name:
+            _POD_CACHE.pop(vmid, None)
+    for desk_id, (_, indexed_pod) in list(_POD_INDEX.items()):
+        if indexed_pod == pod_name:
+            del _POD_INDEX[desk_id]
+
+
+def _index_pod(desk_id: Optional[str], vm_name: str, pod_name: str, running: bool) -> None:
+    """Apply one pod event to _POD_INDEX / _POD_CACHE. Runs on the event loop."""
+    if not running:
+        _evict_pod(pod_name)
+    elif desk_id:
+        _POD_INDEX[desk_id] = (vm_name, pod_name)
+        _POD_MISSES.pop(desk_id, None)
+
+
+def _reset_pod_index(snapshot: dict[str, tuple[str, str]]) -> None:
+    """Replace _POD_INDEX with a fresh list result. Runs on the event loop."""
+    _POD_INDEX.clear()
+    _POD_INDEX.update(snapshot)
+    _POD_CACHE.clear()
+
+
+def _watch_virt_launcher_pods(
+    core_api: CoreV1Api,
+    loop: asyncio.AbstractEventLoop,
+    pod_watch: watch.Watch,
+    stop: threading.Event,
+) -> None:
+    """
+    List, then watch, virt-launcher pods and mirror the Running ones into
+    _POD_INDEX. Runs in a daemon thread; updates are handed to the event loop.
+    Relists from scratch when the watch's resourceVersion expires (410 Gone).
+    """
+    resource_version: Optional[str] = None
+    while not stop.is_set():
+        try:
+            if resource_version is None:
+                pod_list = core_api.list_namespaced_pod(
+                    namespace=VMI_NAMESPACE,
+                    label_selector=VM_DOMAIN_LABEL,
+                    field_selector=_pod_field_selector(),
+                    _request_timeout=30,
+                )
+                snapshot: dict[str, tuple[str, str]] = {}
+                for pod in pod_list.items:
+                    labels = pod.metadata.labels or {}
+                    if pod.status.phase == "Running" and labels.get(DESK_ID_LABEL):
+                        snapshot[labels[DESK_ID_LABEL]] = (labels.get(VM_DOMAIN_LABEL, ""), pod.metadata.name)
+                loop.call_soon_threadsafe(_reset_pod_index, snapshot)
+                resource_version = pod_list.metadata.resource_version
+                LOG.info("Indexed %d running virt-launcher pods", len(snapshot))
+
+            for event in pod_watch.stream(
+                core_api.list_namespaced_pod,
+                namespace=VMI_NAMESPACE,
+                label_selector=VM_DOMAIN_LABEL,
+                field_selector=_pod_field_selector(),
+                resource_version=resource_version,
+                allow_watch_bookmarks=True,
+                timeout_seconds=300,
+            ):
+                if event["type"] == "BOOKMARK":
+                    resource_version = event["raw_object"]["metadata"]["resourceVersion"]
+                    continue
+                pod = event["object"]
+                resource_version = pod.metadata.resource_version
+                labels = pod.metadata.labels or {}
+                loop.call_soon_threadsafe(
+                    _index_pod,
+                    labels.get(DESK_ID_LABEL),
+                    labels.get(VM_DOMAIN_LABEL, ""),
+                    pod.metadata.name,
+                    event["type"] != "DELETED" and pod.status.phase == "Running",
+                )
+        except ApiException as e:
+            if stop.is_set():
+                return
+            if e.status == 410:
+                LOG.info("virt-launcher pod watch expired, relisting")
+                resource_version = None
+                continue
+            LOG.warning("virt-launcher pod watch interrupted, restarting: %s", e)
+            stop.wait(5)
+        except Exception as e:
+            if stop.is_set():
+                return
+            LOG.warning("virt-launcher pod watch interrupted, restarting: %s", e)
+            stop.wait(5)
+
+
+async def _resolve_vmi_ip(
+    k8s_custom: AsyncCustomObjectsApi, vmid: str, vm_namespace: str, use_cache: bool = False
+) -> str:
+    """
+    Return the IP of the Running VMI behind Cyberdesk *vmid*, for in-cluster proxying.
+
+    With *use_cache* an address read in the last couple of seconds is reused, so
+    bursts of health checks skip the CR and VMI reads; callers evict the entry
+    when the address stops answering. Lookup failures raise ValueError.
+    """
+    if use_cache:
+        cached = _VMI_IP_CACHE.get(vmid)
+        if cached is not None:
+            return cached
+
+    vm_name: Optional[str] = None
+    vmi_ip: Optional[str] = None
+    # 1. Get CR to find VM name
+    try:
+        cr = await k8s_custom.get_namespaced_custom_object(
+            group=CYBERDESK_GROUP,
+            version=CYBERDESK_VERSION,
+            namespace=CYBERDESK_NAMESPACE,
+            plural=CYBERDESK_PLURAL,
+            name=vmid, # vmid is the instance ID here
+        )
+        vm_name = cr.get("status", {}).get("cyberdesk_create", {}).get("virtualMachineRef")
+        if not vm_name:
+            raise ValueError(f"virtualMachineRef not found in status for Cyberdesk {vmid}")
+        LOG.debug("Found virtualMachineRef '%s' for instance %s", vm_name, vmid)
+    except ApiException as e:
+        if e.status == 404:
+            raise ValueError(f"Cyberdesk CR '{vmid}' not found.") from e
+        else:
+            raise ValueError(f"API Error fetching Cyberdesk CR '{vmid}': {e.reason}") from e
+
+    # 2. Get VMI to find IP address
+    try:
+        vmi = await k8s_custom.get_namespaced_custom_object(
+            group=KUBEVIRT_GROUP,
+            version=KUBEVIRT_VERSION,
+            namespace=vm_namespace,
+            plural=KUBEVIRT_VMI_PLURAL,
+            name=vm_name,
+        )
+        interfaces = vmi.get('status', {}).get('interfaces', [])
+        vmi_ip = interfaces[0].get('ipAddress') if interfaces else None
+        vmi_phase = vmi.get('status', {}).get('phase')
+
+        if vmi_phase != 'Running':
+             raise ValueError(f"Target VMI '{vm_name}' is not Running (phase: {vmi_phase}).")
+        if not vmi_ip:
+             raise ValueError(f"Target VMI '{vm_name}' is Running but has no IP address.")
+        LOG.debug("Found target VMI IP '%s' for VM '%s'", vmi_ip, vm_name)
+    except ApiException as e:
+        if e.status == 404:
+             raise ValueError(f"VMI '{vm_name}' not found.") from e
+        else:
+             raise ValueError(f"API Error fetching VMI '{vm_name}': {e.reason}") from e
+
+    _VMI_IP_CACHE[vmid] = vmi_ip
+    return vmi_ip
+
+
+# (vmid, port, path) -> recent answer, for callers that opt into reuse
+_VM_GET_RESULTS: TTLCache[tuple[str, int, str], tuple[int, Any]] = TTLCache(maxsize=4096, ttl=VM_HEALTH_CACHE_TTL)
+
+# (vmid, port, path) -> the GET already on its way to that VM
+_VM_GETS_IN_FLIGHT: dict[tuple[str, int, str], asyncio.Task[tuple[int, Any]]] = {}
+
+
+def _forget_vm_get(key: tuple[str, int, str], task: asyncio.Task[tuple[int, Any]]) -> None:
+    """Done-callback for a shared GET: unregister it and mark its outcome as seen."""
+    _VM_GETS_IN_FLIGHT.pop(key, None)
+    if not task.cancelled():
+        task.exception() # Every waiter may have gone away before it finished
+
+
 async def _proxy_request_to_vm(
+    vmid: str,
+    port: int,
+    path: str,
+    method: str = "GET",
+    json_payload: Optional[dict] = None,
+    timeout: float = 10.0,
+    reuse_recent: bool = False,
+) -> tuple[int, Any]:
+    """
+    Sends an HTTP request to a specific port/path on the VM pod; see
+    _forward_to_vm for routing, return value and errors.
+
+    Concurrent GETs for the same VM endpoint share a single upstream request,
+    so overlapping health probes cost one pod lookup and one VM call. With
+    *reuse_recent*, a GET answered within VM_HEALTH_CACHE_TTL is served again.
+    """
+    if method != "GET":
+        return await _forward_to_vm(vmid, port, path, method, json_payload, timeout)
+
+    key = (vmid, port, path)
+    if reuse_recent:
+        recent = _VM_GET_RESULTS.get(key)
+        if recent is not None:
+            return recent
+    shared = _VM_GETS_IN_FLIGHT.get(key)
+    if shared is None:
+        shared = asyncio.create_task(_forward_to_vm(vmid, port, path, method, json_payload, timeout))
+        _VM_GETS_IN_FLIGHT[key] = shared
+        shared.add_done_callback(functools.partial(_forget_vm_get, key))
+    # Shielded, so one caller disconnecting doesn't cancel it for the others
+    result = await asyncio.shield(shared)
+    if reuse_recent:
+        _VM_GET_RESULTS[key] = result
+    return result
+
+
+async def _forward_to_vm(
     vmid: str,
     port: int,
     path: str,
@@ -670,226 +1801,135 @@ async def _proxy_request_to_vm(
         HTTPException: If the request fails due to connection errors, timeouts,
                        API errors, non-2xx VM responses, or pod lookup issues.
     """
-    vm_namespace = "kubevirt"
+    vm_namespace = VMI_NAMESPACE
     path = path.lstrip('/') # Ensure path doesn't start with /
+    k8s_custom = require_k8s() # Both branches resolve the CR first
 
-    # Check if running in-cluster
-    token_path = Path("/var/run/secrets/kubernetes.io/serviceaccount/token")
-    in_cluster = token_path.exists()
-
-    if in_cluster:
+    if IN_CLUSTER:
         # --- In-Cluster Logic (Get VMI IP) ---
-        LOG.info(f"Proxying {method} to VM {vmid} (in-cluster) via IP lookup -> :{port}/{path}")
-        k8s_custom = require_k8s()
-        vm_name: Optional[str] = None
-        vmi_ip: Optional[str] = None
+        LOG.info("Proxying %s to VM %s (in-cluster) via IP lookup -> :%s/%s", method, vmid, port, path)
         target_url: Optional[str] = None
 
         try:
-            # 1. Get CR to find VM name
-            try:
-                cr = k8s_custom.get_namespaced_custom_object(
-                    group=CYBERDESK_GROUP,
-                    version=CYBERDESK_VERSION,
-                    namespace=CYBERDESK_NAMESPACE,
-                    plural=CYBERDESK_PLURAL,
-                    name=vmid, # vmid is the instance ID here
-                )
-                vm_name = cr.get("status", {}).get("cyberdesk_create", {}).get("virtualMachineRef")
-                if not vm_name:
-                    raise ValueError(f"virtualMachineRef not found in status for Cyberdesk {vmid}")
-                LOG.debug(f"Found virtualMachineRef '{vm_name}' for instance {vmid}")
-            except ApiException as e:
-                if e.status == 404:
-                    raise ValueError(f"Cyberdesk CR '{vmid}' not found.") from e
-                else:
-                    raise ValueError(f"API Error fetching Cyberdesk CR '{vmid}': {e.reason}") from e
-
-            # 2. Get VMI to find IP address
-            try:
-                vmi = k8s_custom.get_namespaced_custom_object(
-                    group=KUBEVIRT_GROUP,
-                    version=KUBEVIRT_VERSION,
-                    namespace=vm_namespace, # Defined earlier in function
-                    plural=KUBEVIRT_VMI_PLURAL,
-                    name=vm_name,
-                )
-                interfaces = vmi.get('status', {}).get('interfaces', [])
-                vmi_ip = interfaces[0].get('ipAddress') if interfaces else None
-                vmi_phase = vmi.get('status', {}).get('phase')
-
-                if vmi_phase != 'Running':
-                     raise ValueError(f"Target VMI '{vm_name}' is not Running (phase: {vmi_phase}).")
-                if not vmi_ip:
-                     raise ValueError(f"Target VMI '{vm_name}' is Running but has no IP address.")
-                LOG.debug(f"Found target VMI IP '{vmi_ip}' for VM '{vm_name}'")
-            except ApiException as e:
-                if e.status == 404:
-                     raise ValueError(f"VMI '{vm_name}' not found.") from e
-                else:
-                     raise ValueError(f"API Error fetching VMI '{vm_name}': {e.reason}") from e
+            # 1-2. CR -> VM name -> VMI IP
+            # Commands always read a fresh address; a reused IP must never get one
+            vmi_ip = await _resolve_vmi_ip(k8s_custom, vmid, vm_namespace, use_cache=method == "GET")
 
             # 3. Construct Target URL
             target_url = f"http://{vmi_ip}:{port}/{path}"
-            LOG.debug(f"Target URL (in-cluster, via IP): {target_url}")
+            LOG.debug("Target URL (in-cluster, via IP): %s", target_url)
 
         except ValueError as e:
              # Handle all lookup errors gracefully
-             LOG.error(f"Failed lookup for VM {vmid} proxy target: {e}")
+             LOG.error("Failed lookup for VM %s proxy target: %s", vmid, e)
              raise HTTPException(status_code=404, detail=f"Target VM or its resources not found/ready: {e}")
 
         # --- Make Request using IP-based URL ---
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        http_client = require_http_client()
+        async with _vm_slot(vmid, method):
             try:
-                response = await client.request(
+                response = await http_client.request(
                     method,
                     target_url,
-                    json=json_payload # httpx handles None payload correctly
+                    content=None if json_payload is None else orjson.dumps(json_payload),
+                    headers=None if json_payload is None else JSON_HEADERS,
+                    # Short connect budget so an unreachable pod doesn't hold a pool slot
+                    timeout=httpx.Timeout(timeout, connect=VM_CONNECT_TIMEOUT),
                 )
-                response.raise_for_status() # Raise exception for 4xx/5xx responses
+                # Non-2xx statuses are returned as-is; the endpoints branch on status_code
 
-                # Attempt to parse response as JSON
+                # Attempt to parse response as JSON straight from the raw body
                 try:
-                    json_response = response.json()
-                    LOG.debug(f"Successfully parsed JSON response from {target_url}")
+                    json_response = orjson.loads(response.content)
+                    LOG.debug("Successfully parsed JSON response from %s", target_url)
                     return response.status_code, json_response
-                except Exception as json_exc: # Catches JSONDecodeError and others
-                    LOG.warning(f"Failed to parse response from {target_url} as JSON: {json_exc}. Returning raw text.")
+                except orjson.JSONDecodeError as json_exc:
+                    LOG.warning("Failed to parse response from %s as JSON: %s. Returning raw text.", target_url, json_exc)
                     return response.status_code, response.text
+            except httpx.ConnectTimeout:
+                _VMI_IP_CACHE.pop(vmid, None) # The VMI may have moved; look it up again next time
+                LOG.error("Timeout connecting to VM %s (in-cluster) at %s", vmid, target_url)
+                raise HTTPException(status_code=504, detail=f"Request timed out connecting to VM {vmid}")
             except httpx.TimeoutException:
-                LOG.error(f"Timeout connecting to VM {vmid} (in-cluster) at {target_url}")
+                LOG.error("Timeout connecting to VM %s (in-cluster) at %s", vmid, target_url)
                 raise HTTPException(status_code=504, detail=f"Request timed out connecting to VM {vmid}")
             except httpx.ConnectError as e:
-                LOG.error(f"Connection error to VM {vmid} (in-cluster) at {target_url}: {e}")
+                _VMI_IP_CACHE.pop(vmid, None)
+                LOG.error("Connection error to VM %s (in-cluster) at %s: %s", vmid, target_url, e)
                 raise HTTPException(status_code=503, detail=f"Could not connect to VM {vmid} (DNS issue?): {e}")
             except Exception as e:
-                LOG.exception(f"Unexpected error during httpx request to VM {vmid} (in-cluster): {e}")
+                LOG.exception("Unexpected error during httpx request to VM %s (in-cluster): %s", vmid, e)
                 raise HTTPException(status_code=500, detail=f"Unexpected error connecting to VM {vmid}")
 
     else:
         # --- Local Logic (Kubernetes API Proxy) ---
-        LOG.info(f"Proxying {method} to VM {vmid} (local) via K8s API -> :{port}/{path}")
+        LOG.info("Proxying %s to VM %s (local) via K8s API -> :%s/%s", method, vmid, port, path)
         core_api = require_k8s_core() # Ensures K8s client is loaded
-        k8s_custom = require_k8s()   # Need custom objects API as well
         api_client = core_api.api_client # Get the underlying ApiClient
 
-        # 1. Find the VM Name from CR
-        vm_name: Optional[str] = None
-        try:
-            cr = k8s_custom.get_namespaced_custom_object(
-                group=CYBERDESK_GROUP,
-                version=CYBERDESK_VERSION,
-                namespace=CYBERDESK_NAMESPACE,
-                plural=CYBERDESK_PLURAL,
-                name=vmid,
-            )
-            vm_name = cr.get("status", {}).get("cyberdesk_create", {}).get("virtualMachineRef")
-            if not vm_name:
-                raise ValueError(f"virtualMachineRef not found in status for Cyberdesk {vmid}")
-            LOG.debug(f"Found virtualMachineRef '{vm_name}' for instance {vmid}")
-        except ApiException as e:
-            if e.status == 404:
-                raise HTTPException(status_code=404, detail=f"Cyberdesk CR '{vmid}' not found.") from e
-            else:
-                raise HTTPException(status_code=500, detail=f"API Error fetching Cyberdesk CR '{vmid}': {e.reason}") from e
-        except ValueError as e:
-            LOG.error(str(e))
-            raise HTTPException(status_code=404, detail=str(e))
-
-        # 2. Find the Pod Name using the VM Name by checking annotations
-        pod_name: Optional[str] = None
-        running_pod_found = False
-        try:
-            LOG.debug(f"Listing pods in namespace '{vm_namespace}' to find one for VM '{vm_name}'.")
-            # List all pods in the namespace - might need adjustment if too many pods
-            pod_list_response = await asyncio.to_thread(
-                core_api.list_namespaced_pod,
-                namespace=vm_namespace,
-                _request_timeout=10 # Increase timeout slightly for list operation
-            )
-            pods = pod_list_response.items
-            LOG.debug(f"Found {len(pods)} pods in namespace. Iterating to find match.")
-
-            for pod in pods:
-                annotations = pod.metadata.annotations
-                pod_domain = annotations.get("kubevirt.io/domain")
-                
-                # Check if annotation matches the target VM name
-                if pod_domain == vm_name:
-                    pod_name = pod.metadata.name
-                    pod_phase = pod.status.phase
-                    LOG.debug(f"Found candidate pod '{pod_name}' with matching domain annotation. Phase: {pod_phase}")
-                    if pod_phase == "Running":
-                        LOG.info(f"Found running virt-launcher pod '{pod_name}' for VM '{vm_name}'.")
-                        running_pod_found = True
-                        break # Found the running pod we need
-                    else:
-                        # Found a pod, but it's not running. Keep looking in case
-                        # there's an older non-running one and a newer running one somehow.
-                         LOG.warning(f"Found pod {pod_name} for VM {vm_name}, but phase is {pod_phase}. Continuing search.")
-                         pod_name = None # Reset pod_name if not running
-                
-            if not running_pod_found:
-                 # If loop finishes and we didn't find a running pod
-                 if pod_name:
-                      # We found a pod but it wasn't running
-                      raise HTTPException(status_code=503, detail=f"VM pod {pod_name} for {vm_name} found but not in Running phase.")
-                 else:
-                      # We didn't find any pod with the matching annotation
-                      LOG.warning(f"No virt-launcher pod found with annotation kubevirt.io/domain={vm_name}")
-                      raise HTTPException(status_code=404, detail=f"VM pod for {vm_name} not found.")
-
-        except ApiException as e:
-            LOG.error(f"K8s API error listing pods for {vm_name}: {e.status} {e.reason}")
-            raise HTTPException(status_code=500, detail=f"API error listing pods for VM {vm_name}: {e.reason}")
-
-        if not pod_name:
-             # Should be caught above, but defensive check
-             raise HTTPException(status_code=500, detail="Could not determine pod name")
+        # 1-2. Resolve the VM name and its Running virt-launcher pod
+        vm_name, pod_name = await _resolve_virt_launcher_pod(k8s_custom, core_api, vmid, vm_namespace)
 
         # 3. Make the Proxied Request (using the found pod_name)
         api_proxy_path = f"/api/v1/namespaces/{vm_namespace}/pods/{pod_name}:{port}/proxy/{path}"
-        LOG.debug(f"Attempting {method} via K8s API proxy path: {api_proxy_path}")
+        LOG.debug("Attempting %s via K8s API proxy path: %s", method, api_proxy_path)
 
         try:
             # Prepare arguments for call_api
             call_api_args = {
                 'resource_path': api_proxy_path,
                 'method': method,
-                'auth_settings': ['BearerToken'],
-                'response_type': 'str', # Expect text back
+                'auth_settings': K8S_AUTH_SETTINGS,
                 '_request_timeout': timeout
             }
-            header_params = {}
             # Set body and Content-Type for methods that have payloads
-            if json_payload is not None and method in ["POST", "PUT", "PATCH"]:
+            if json_payload is not None and method in ("POST", "PUT", "PATCH"):
                 call_api_args['body'] = json_payload
-                header_params['Content-Type'] = api_client.select_header_content_type(['application/json'])
-                call_api_args['header_params'] = header_params
+                call_api_args['header_params'] = dict(JSON_HEADERS)
 
             # Run synchronous call_api in thread
-            response_data = await asyncio.to_thread(
-                api_client.call_api,
-                **call_api_args
-            )
-
-            # response_data = (data, status_code, headers)
-            status_code = response_data[1]
-            response_text = response_data[0]
-            LOG.debug(f"K8s API proxy request to VM {vmid} completed with status: {status_code}")
-            LOG.debug(f"Response data: {response_data}...")
+            async with _vm_slot(vmid, method):
+                try:
+                    response_body, status_code = await _k8s_call(
+                        _call_api_raw,
+                        api_client,
+                        **call_api_args
+                    )
+                except ApiException as e:
+                    if e.status != 404:
+                        raise
+                    if not _is_pod_gone(e):
+                        # The VM itself answered 404; hand that back as its response
+                        response_body = e.body if isinstance(e.body, bytes) else (e.body or "").encode()
+                        status_code = e.status
+                    else:
+                        # The cached pod is gone; if a lookup finds a different one, retry there once
+                        stale_pod = pod_name
+                        _evict_pod(stale_pod)
+                        vm_name, pod_name = await _resolve_virt_launcher_pod(k8s_custom, core_api, vmid, vm_namespace)
+                        if pod_name == stale_pod:
+                            raise
+                        LOG.info("Pod '%s' for %s is gone; retrying on '%s'", stale_pod, vmid, pod_name)
+                        call_api_args['resource_path'] = f"/api/v1/namespaces/{vm_namespace}/pods/{pod_name}:{port}/proxy/{path}"
+                        response_body, status_code = await _k8s_call(
+                            _call_api_raw,
+                            api_client,
+                            **call_api_args
+                        )
+
+            LOG.debug("K8s API proxy request to VM %s completed with status: %s", vmid, status_code)
             # Attempt to parse response as JSON, fall back to text
             try:
-                corrected_json_string = response_text.replace("'", '"') # Basic, might break
-                json_response = json.loads(corrected_json_string)
-                LOG.debug(f"Successfully parsed JSON response from K8s proxy for {vmid}")
+                json_response = orjson.loads(response_body)
+                LOG.debug("Successfully parsed JSON response from K8s proxy for %s", vmid)
                 return status_code, json_response
-            except json.JSONDecodeError:
-                LOG.warning(f"Failed to parse response from K8s proxy for {vmid} as JSON. Returning raw text. {response_text[:100]}...")
+            except orjson.JSONDecodeError:
+                response_text = response_body.decode("utf-8", errors="replace")
+                LOG.warning("Failed to parse response from K8s proxy for %s as JSON. Returning raw text. %.100s...", vmid, response_text)
                 return status_code, response_text
 
         except ApiException as e:
-            LOG.error(f"K8s API error during proxy request to {vmid}: {e.status} {e.reason} - Body: {e.body}")
+            LOG.error("K8s API error during proxy request to %s: %s %s - Body: %s", vmid, e.status, e.reason, e.body)
             # Map common K8s API errors during proxying
             if e.status == 404:
                  detail = f"Proxy path not found on pod '{pod_name}' (or pod disappeared)."
@@ -904,10 +1944,12 @@ async def _proxy_request_to_vm(
                  detail = f"Kubernetes API error during proxy: {e.reason}"
                  http_status = 500
             raise HTTPException(status_code=http_status, detail=detail)
+        except HTTPException:
+            raise # From re-resolving the pod after a 404
         except asyncio.TimeoutError:
-             LOG.error(f"Timeout during K8s API proxy request to {vmid}")
+             LOG.error("Timeout during K8s API proxy request to %s", vmid)
              raise HTTPException(status_code=504, detail=f"Request via K8s API timed out for VM {vmid}")
         except Exception as e:
-            LOG.exception(f"Unexpected error during K8s API proxy request to {vmid}: {e}")
+            LOG.exception("Unexpected error during K8s API proxy request to %s: %s", vmid, e)
             raise HTTPException(status_code=500, detail=f"Unexpected error during proxy request to VM {vmid}")
 